@@ -0,0 +1,185 @@
+# In-memory index over fetched Raindrop objects
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Iterable
+from urllib.parse import urlparse
+
+from domain.raindrop import Raindrop
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> set[str]:
+    if not text:
+        return set()
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def _domain(link: str) -> str:
+    if not link:
+        return ""
+    host = urlparse(link).hostname or ""
+    return host.removeprefix("www.")
+
+
+class RaindropIndex:
+    def __init__(self, raindrops: Iterable[Raindrop] = None):
+        self.raindrops: dict[int, Raindrop] = {}
+        self._tags: dict[str, set[int]] = {}
+        self._domains: dict[str, set[int]] = {}
+        self._tokens: dict[str, set[int]] = {}
+        # 前方一致検索用にソート済みのトークン一覧を保持する
+        self._sorted_tokens: list[str] = []
+        # RaindropIOのbulk系メソッドは複数スレッドから更新することがあるため、
+        # 更新と検索はこのロックの中で行う（読み込み→更新を1回の操作にする場合も使う）
+        self.lock = threading.RLock()
+        if raindrops:
+            self.add_all(raindrops)
+
+    def __len__(self):
+        return len(self.raindrops)
+
+    def __contains__(self, _id: int):
+        return _id in self.raindrops
+
+    def get(self, _id: int) -> Raindrop:
+        return self.raindrops.get(_id)
+
+    @staticmethod
+    def _post(postings: dict[str, set[int]], key: str, _id: int) -> bool:
+        # 新しいキーが追加された場合はTrueを返す
+        ids = postings.get(key)
+        if ids is None:
+            postings[key] = {_id}
+            return True
+        ids.add(_id)
+        return False
+
+    @staticmethod
+    def _unpost(postings: dict[str, set[int]], key: str, _id: int) -> bool:
+        # キーが空になって削除された場合はTrueを返す
+        ids = postings.get(key)
+        if ids is None:
+            return False
+        ids.discard(_id)
+        if ids:
+            return False
+        del postings[key]
+        return True
+
+    def _text_tokens(self, raindrop: Raindrop) -> set[str]:
+        return _tokenize(raindrop.title) | _tokenize(raindrop.link)
+
+    def add(self, raindrop: Raindrop) -> None:
+        with self.lock:
+            if raindrop._id is None:
+                raise Exception("Raindrop._id is required to be indexed.")
+            if raindrop._id in self.raindrops:
+                self.remove(raindrop._id)
+
+            _id = raindrop._id
+            self.raindrops[_id] = raindrop
+            for tag in raindrop.tags or []:
+                self._post(self._tags, tag, _id)
+            self._post(self._domains, _domain(raindrop.link), _id)
+            for token in self._text_tokens(raindrop):
+                if self._post(self._tokens, token, _id):
+                    insort(self._sorted_tokens, token)
+
+    def add_all(self, raindrops: Iterable[Raindrop]) -> None:
+        # bulk_getのページ単位でもbulk_get_allの結果全体でも渡せる
+        for raindrop in raindrops:
+            self.add(raindrop)
+
+    def remove(self, _id: int) -> None:
+        with self.lock:
+            raindrop = self.raindrops.pop(_id, None)
+            if raindrop is None:
+                return
+            for tag in raindrop.tags or []:
+                self._unpost(self._tags, tag, _id)
+            self._unpost(self._domains, _domain(raindrop.link), _id)
+            for token in self._text_tokens(raindrop):
+                if self._unpost(self._tokens, token, _id):
+                    i = bisect_left(self._sorted_tokens, token)
+                    del self._sorted_tokens[i]
+
+    def tags(self) -> list[str]:
+        with self.lock:
+            return sorted(self._tags)
+
+    def find_by_tag(self, tag: str) -> set[int]:
+        with self.lock:
+            return set(self._tags.get(tag, ()))
+
+    def find_by_tags(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+    ) -> set[int]:
+        # all_of: AND, any_of: OR, none_of: NOT
+        with self.lock:
+            all_of = list(all_of)
+            any_of = list(any_of)
+
+            if all_of:
+                # 件数の少ないポスティングリストから積集合を取る
+                postings = sorted(
+                    (self._tags.get(tag, set()) for tag in all_of), key=len
+                )
+                result = set(postings[0])
+                for ids in postings[1:]:
+                    result &= ids
+            else:
+                result = None
+
+            if any_of:
+                union = set().union(*(self._tags.get(tag, set()) for tag in any_of))
+                result = union if result is None else result & union
+
+            if result is None:
+                result = set(self.raindrops)
+
+            for tag in none_of:
+                result -= self._tags.get(tag, set())
+            return result
+
+    def find_by_domain(self, domain: str) -> set[int]:
+        with self.lock:
+            return set(self._domains.get(domain.lower().removeprefix("www."), ()))
+
+    def _find_by_prefix(self, prefix: str) -> set[int]:
+        result = set()
+        i = bisect_left(self._sorted_tokens, prefix)
+        while i < len(self._sorted_tokens):
+            token = self._sorted_tokens[i]
+            if not token.startswith(prefix):
+                break
+            result |= self._tokens[token]
+            i += 1
+        return result
+
+    def search(self, query: str, prefix: bool = True) -> set[int]:
+        # タイトルとリンクのトークンに対する検索（全トークンのAND）
+        # prefix=Trueの場合、各トークンを前方一致で扱う
+        with self.lock:
+            tokens = TOKEN_PATTERN.findall(query.lower())
+            if not tokens:
+                return set()
+
+            result = None
+            for token in tokens:
+                if prefix:
+                    ids = self._find_by_prefix(token)
+                else:
+                    ids = self._tokens.get(token, set())
+                result = set(ids) if result is None else result & ids
+                if not result:
+                    break
+            return result
+
+    def to_raindrops(self, ids: Iterable[int]) -> list[Raindrop]:
+        with self.lock:
+            return [self.raindrops[_id] for _id in ids if _id in self.raindrops]
@@ -0,0 +1,208 @@
+# Rule engine that decides tags for Raindrop objects in batches
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Iterable, Iterator
+from urllib.parse import urlparse
+
+from domain.raindrop import Raindrop
+
+WORD_PATTERN = re.compile(r"\w")
+
+
+class TagRule:
+    # いずれかの条件に一致した場合にtagsを付与する
+    def __init__(
+        self,
+        tags: list[str],
+        domains: list[str] = None,
+        url_patterns: list[str] = None,
+        title_keywords: list[str] = None,
+    ):
+        if not tags:
+            raise Exception("TagRule.tags is required.")
+        self.tags = tags
+        self.domains = domains or []
+        self.url_patterns = url_patterns or []
+        self.title_keywords = title_keywords or []
+
+
+class CompiledRules:
+    # ドメインとタイトルのキーワードは、ルールごとに評価せずまとめて1回で照合する
+    def __init__(self, rules: list[TagRule]):
+        self.rule_tags = [tuple(rule.tags) for rule in rules]
+
+        self.domains: dict[str, list[int]] = {}
+        self.keywords: dict[str, list[int]] = {}
+        url_patterns: list[tuple[int, str]] = []
+        for i, rule in enumerate(rules):
+            for domain in rule.domains:
+                self.domains.setdefault(domain.lower(), []).append(i)
+            for keyword in rule.title_keywords:
+                self.keywords.setdefault(keyword.lower(), []).append(i)
+            for pattern in rule.url_patterns:
+                url_patterns.append((i, pattern))
+
+        # URLパターンは結合しない（グループ名の重複やインラインフラグ、
+        # 後方参照の番号が結合すると壊れるため）。同じパターンは1回だけ照合する
+        pattern_rules: dict[str, list[int]] = {}
+        for i, pattern in url_patterns:
+            pattern_rules.setdefault(pattern, []).append(i)
+        self.url_patterns = [
+            (re.compile(pattern), indexes) for pattern, indexes in pattern_rules.items()
+        ]
+
+        # キーワードが始まりうる位置だけを先読みで探す（幅0なので重なりも拾える）
+        # 各位置で全キーワード長を辞書で引くため、長いキーワードの中にある
+        # 短いキーワードも一致する（"machine learning" と "learning" など）
+        self.keyword_lengths = sorted({len(k) for k in self.keywords})
+        self.keyword_start = (
+            re.compile(
+                r"(?<!\w)(?=" + "|".join(re.escape(k) for k in self.keywords) + ")"
+            )
+            if self.keywords
+            else None
+        )
+
+    def _match_domain(self, link: str) -> set[int]:
+        host = (urlparse(link).hostname or "") if link else ""
+        matched = set()
+        # サブドメインも親ドメインのルールに一致させる
+        parts = host.split(".")
+        for n in range(len(parts)):
+            matched.update(self.domains.get(".".join(parts[n:]), ()))
+        return matched
+
+    def _match_url(self, link: str) -> set[int]:
+        matched = set()
+        if not link:
+            return matched
+        for pattern, indexes in self.url_patterns:
+            if pattern.search(link):
+                matched.update(indexes)
+        return matched
+
+    def _match_title(self, title: str) -> set[int]:
+        if not title or self.keyword_start is None:
+            return set()
+        title = title.lower()
+        matched = set()
+        for m in self.keyword_start.finditer(title):
+            start = m.start()
+            for length in self.keyword_lengths:
+                end = start + length
+                indexes = self.keywords.get(title[start:end])
+                if indexes and not WORD_PATTERN.match(title, end):
+                    matched.update(indexes)
+        return matched
+
+    def match(self, link: str, title: str) -> tuple[str, ...]:
+        matched = (
+            self._match_domain(link) | self._match_url(link) | self._match_title(title)
+        )
+        tags = set()
+        for i in matched:
+            tags.update(self.rule_tags[i])
+        return tuple(sorted(tags))
+
+    def match_page(
+        self, page: list[tuple[int, str, str]]
+    ) -> list[tuple[int, tuple[str, ...]]]:
+        # page: (_id, link, title) のリスト
+        return [(_id, self.match(link, title)) for _id, link, title in page]
+
+
+# ワーカープロセスごとに一度だけコンパイル済みルールを保持する
+_worker_rules: CompiledRules = None
+
+
+def _init_worker(rules: list[TagRule]) -> None:
+    global _worker_rules
+    _worker_rules = CompiledRules(rules)
+
+
+def _match_page_in_worker(page: list[tuple[int, str, str]]):
+    return _worker_rules.match_page(page)
+
+
+class TagRuleEngine:
+    def __init__(self, rules: list[TagRule], max_workers: int = None, page_size=1000):
+        # max_workers: 1の場合はプロセスプールを使わずに評価する
+        self.rules = rules
+        self.compiled = CompiledRules(rules)
+        self.max_workers = max_workers
+        self.page_size = page_size
+
+    def _pages(self, raindrops: Iterable[Raindrop]) -> Iterator[list[Raindrop]]:
+        iterator = iter(raindrops)
+        while True:
+            page = list(islice(iterator, self.page_size))
+            if not page:
+                return
+            yield page
+
+    def _evaluate(
+        self, pages: Iterable[list[Raindrop]]
+    ) -> Iterator[tuple[list[Raindrop], list[tuple[int, tuple[str, ...]]]]]:
+        pages = iter(pages)
+        first = next(pages, None)
+        if first is None:
+            return
+        second = next(pages, None)
+
+        # 1ページ以下の入力ではプロセスプールを起動しない
+        if self.max_workers == 1 or second is None:
+            for page in chain([first], [second] if second else [], pages):
+                yield page, self.compiled.match_page(
+                    [(r._id, r.link, r.title) for r in page]
+                )
+            return
+
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(self.rules,),
+        ) as executor:
+            # Raindropオブジェクトではなく照合に必要な値だけをワーカーに送る
+            # 投入するページはmax_workers件までにし、入力を先読みしすぎない
+            pending = deque()
+            try:
+                for page in chain([first, second], pages):
+                    payload = [(r._id, r.link, r.title) for r in page]
+                    pending.append(
+                        (page, executor.submit(_match_page_in_worker, payload))
+                    )
+                    if len(pending) >= max_workers:
+                        page, future = pending.popleft()
+                        yield page, future.result()
+                while pending:
+                    page, future = pending.popleft()
+                    yield page, future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def assign(
+        self, raindrops: Iterable[Raindrop]
+    ) -> dict[tuple[str, ...], list[Raindrop]]:
+        # 付与するタグの組み合わせごとにRaindropをまとめる
+        # 戻り値はそのままbulk_updateのtagsとraindropsに渡せる
+        groups: dict[tuple[str, ...], list[Raindrop]] = {}
+        for page, matches in self._evaluate(self._pages(raindrops)):
+            for raindrop, (_, tags) in zip(page, matches):
+                if tags:
+                    groups.setdefault(tags, []).append(raindrop)
+        return groups
+
+    @staticmethod
+    def apply(
+        raindropio,
+        src_collection_id: int,
+        groups: dict[tuple[str, ...], list[Raindrop]],
+    ) -> None:
+        # 既存のタグに追加する（bulk_update_tagsのoverwrite=Falseと同じ）
+        for tags, raindrops in groups.items():
+            raindropio.bulk_update(src_collection_id, raindrops, tags=list(tags))
@@ -0,0 +1,360 @@
+# Command line entry point for bulk operations
+#
+# Heavy modules (requests, repository.*) are imported inside the commands so
+# that `raindropio --help` and argument errors return immediately.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Iterator, TextIO
+
+
+class Profiler:
+    # RaindropIO._make_requestを包み、メソッドごとのリクエスト数と時間を集計する
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, raindropio) -> None:
+        make_request = raindropio._make_request
+
+        def profiled(method: str, url: str, body=None, query=None):
+            started = time.perf_counter()
+            try:
+                return make_request(method=method, url=url, body=body, query=query)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.counts[method] = self.counts.get(method, 0) + 1
+                    self.seconds[method] = self.seconds.get(method, 0.0) + elapsed
+
+        raindropio._make_request = profiled
+
+    def print(self, file: TextIO = None) -> None:
+        file = file or sys.stderr
+        total = time.perf_counter() - self.started
+        for method in sorted(self.counts):
+            count = self.counts[method]
+            seconds = self.seconds[method]
+            print(
+                f"{method:<6} {count:>6} requests {seconds:>9.3f}s "
+                f"({seconds / count * 1000:.1f}ms avg)",
+                file=file,
+            )
+        print(
+            f"total  {sum(self.counts.values()):>6} requests {total:>9.3f}s wall",
+            file=file,
+        )
+
+
+def _open_input(path: str) -> TextIO:
+    if path is None or path == "-":
+        return sys.stdin
+    return open(path, encoding="utf-8")
+
+
+def _open_output(path: str) -> TextIO:
+    if path is None or path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8")
+
+
+def _raindrop_to_dict(raindrop) -> dict:
+    return {
+        "_id": raindrop._id,
+        "collection_id": raindrop.collection_id,
+        "link": raindrop.link,
+        "title": raindrop.title,
+        "tags": raindrop.tags,
+    }
+
+
+def _read_raindrops(f: TextIO, collection_id: int = None) -> Iterator:
+    # 1行ごとにJSON（exportの出力）またはidだけを読み、Raindropを順に返す
+    from domain.raindrop import Raindrop
+    from domain.raindrop_id import RaindropId
+
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.isdigit():
+            yield Raindrop(link=None, _id=RaindropId(int(line)))
+            continue
+        item = json.loads(line)
+        _id = item.get("_id")
+        yield Raindrop(
+            link=item.get("link"),
+            _id=RaindropId(_id) if _id is not None else None,
+            collection_id=(
+                collection_id
+                if collection_id is not None
+                else item.get("collection_id")
+            ),
+            title=item.get("title"),
+            tags=item.get("tags"),
+        )
+
+
+def _write_lines(f: TextIO, raindrops) -> int:
+    count = 0
+    for raindrop in raindrops:
+        f.write(json.dumps(_raindrop_to_dict(raindrop), ensure_ascii=False) + "\n")
+        count += 1
+    f.flush()
+    return count
+
+
+def _map_chunks(func: Callable, chunks: Iterable, args) -> Iterator:
+    # チャンクごとのリクエストを--workers件まで並行して送り、入力順に結果を返す
+    # 入力は送信中の件数分しか先読みしないため、メモリはチャンク数件分で済む
+    from concurrent.futures import ThreadPoolExecutor
+
+    from repository.sync_scheduler import RateLimiter
+
+    rate_limiter = RateLimiter(args.rate)
+
+    def call(chunk):
+        rate_limiter.acquire()
+        return func(chunk)
+
+    if args.workers <= 1:
+        for chunk in chunks:
+            yield call(chunk)
+        return
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(call, chunk))
+                if len(pending) >= args.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _export(raindropio, args) -> None:
+    from repository.sync_scheduler import RateLimiter, SyncScheduler
+
+    scheduler = SyncScheduler(
+        raindropio,
+        max_workers=args.workers,
+        rate_limiter=RateLimiter(args.rate),
+    )
+    results = scheduler.sync(args.collection_ids)
+
+    if args.format == "snapshot":
+        from repository.snapshot import write_snapshot
+
+        if args.output in (None, "-"):
+            raise SystemExit("--output is required for --format snapshot")
+        raindrops = (r for _, items in results for r in items)
+        count = write_snapshot(args.output, raindrops)
+        print(f"exported {count} raindrops", file=sys.stderr)
+        return
+
+    out = _open_output(args.output)
+    try:
+        # 取得が終わったコレクションから順に書き出す
+        for collection_id, items in results:
+            count = _write_lines(out, items)
+            print(f"collection {collection_id}: {count} raindrops", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def _import(raindropio, args) -> None:
+    f = _open_input(args.input)
+    out = _open_output(args.output)
+    try:
+        raindrops = _read_raindrops(f, collection_id=args.collection_id)
+        chunks = raindropio._split_list(
+            raindrops, max_items=raindropio.MAX_ITEMS_PER_REQUEST
+        )
+        created = _map_chunks(raindropio._bulk_create, chunks, args)
+        count = _write_lines(out, (r for items in created for r in items))
+        print(f"imported {count} raindrops", file=sys.stderr)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+def _plan_and_execute(raindropio, args, queue) -> None:
+    from repository.bulk_update_planner import BulkUpdatePlanner
+
+    planner = BulkUpdatePlanner(raindropio)
+    f = _open_input(args.input)
+    try:
+        queue(planner, _read_raindrops(f))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    from repository.sync_scheduler import RateLimiter
+
+    report = planner.execute(
+        dry_run=args.dry_run,
+        max_workers=args.workers,
+        rate_limiter=RateLimiter(args.rate),
+    )
+    prefix = "would send" if args.dry_run else "sent"
+    print(
+        f"{prefix} {report['planned_requests']} requests "
+        f"for {report['queued_items']} raindrops",
+        file=sys.stderr,
+    )
+
+
+def _retag(raindropio, args) -> None:
+    tags = [tag.strip() for tag in args.tags.split(",") if tag.strip()]
+    _plan_and_execute(
+        raindropio,
+        args,
+        lambda planner, raindrops: planner.queue_tags(
+            args.src_collection_id, raindrops, tags, overwrite=args.overwrite
+        ),
+    )
+
+
+def _move(raindropio, args) -> None:
+    _plan_and_execute(
+        raindropio,
+        args,
+        lambda planner, raindrops: planner.queue_move(
+            args.src_collection_id, raindrops, args.dst_collection_id
+        ),
+    )
+
+
+def _delete(raindropio, args) -> None:
+    f = _open_input(args.input)
+    try:
+        chunks = raindropio._split_list(
+            _read_raindrops(f), max_items=raindropio.MAX_ITEMS_PER_REQUEST
+        )
+        count = sum(
+            _map_chunks(
+                lambda chunk: raindropio._bulk_delete(args.src_collection_id, chunk),
+                chunks,
+                args,
+            )
+        )
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    print(f"deleted {count} raindrops", file=sys.stderr)
+
+
+def _add_concurrency_arguments(parser: argparse.ArgumentParser, workers: int) -> None:
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=workers,
+        help=f"requests sent concurrently (default: {workers})",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=2.0,
+        help="requests per second shared by all workers (default: 2.0)",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="raindropio", description="Bulk operations for raindrop.io"
+    )
+    parser.add_argument(
+        "--token",
+        default=os.getenv("RAINDROPIO_API_TOKEN"),
+        help="API token (default: $RAINDROPIO_API_TOKEN)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print request counts and timings to stderr",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="export collections")
+    export.add_argument("collection_ids", type=int, nargs="+")
+    export.add_argument("-o", "--output", help="output file (default: stdout)")
+    export.add_argument("--format", choices=["jsonl", "snapshot"], default="jsonl")
+    _add_concurrency_arguments(export, workers=4)
+    export.set_defaults(func=_export)
+
+    import_ = subparsers.add_parser("import", help="create raindrops from JSONL")
+    import_.add_argument("-i", "--input", help="input file (default: stdin)")
+    import_.add_argument("-o", "--output", help="created raindrops (default: stdout)")
+    import_.add_argument("--collection-id", type=int)
+    _add_concurrency_arguments(import_, workers=1)
+    import_.set_defaults(func=_import)
+
+    retag = subparsers.add_parser("retag", help="add or overwrite tags")
+    retag.add_argument("src_collection_id", type=int)
+    retag.add_argument("--tags", required=True, help="comma separated tags")
+    retag.add_argument("--overwrite", action="store_true")
+    retag.add_argument("-i", "--input", help="ids or JSONL (default: stdin)")
+    retag.add_argument("--dry-run", action="store_true")
+    _add_concurrency_arguments(retag, workers=1)
+    retag.set_defaults(func=_retag)
+
+    move = subparsers.add_parser("move", help="move raindrops to a collection")
+    move.add_argument("src_collection_id", type=int)
+    move.add_argument("dst_collection_id", type=int)
+    move.add_argument("-i", "--input", help="ids or JSONL (default: stdin)")
+    move.add_argument("--dry-run", action="store_true")
+    _add_concurrency_arguments(move, workers=1)
+    move.set_defaults(func=_move)
+
+    delete = subparsers.add_parser("delete", help="delete raindrops")
+    delete.add_argument("src_collection_id", type=int)
+    delete.add_argument("-i", "--input", help="ids or JSONL (default: stdin)")
+    _add_concurrency_arguments(delete, workers=1)
+    delete.set_defaults(func=_delete)
+
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.token:
+        print(
+            "API token is required (--token or RAINDROPIO_API_TOKEN)", file=sys.stderr
+        )
+        return 2
+
+    from repository.raindropio import RaindropIO
+
+    raindropio = RaindropIO(args.token)
+    profiler = None
+    if args.profile:
+        profiler = Profiler()
+        profiler.attach(raindropio)
+
+    try:
+        args.func(raindropio, args)
+    except Exception as e:
+        # APIのエラーはトレースバックではなく、stderrに1行で報告する
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if profiler:
+            profiler.print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from domain.raindrop import Raindrop
+from repository.raindropio import RaindropIO
+
+
+class _PendingUpdate:
+    def __init__(self, src_collection_id: int, raindrop: Raindrop):
+        self.src_collection_id = src_collection_id
+        self.raindrop = raindrop
+        self.clear = False
+        self.tags: list[str] = []
+        self.dst_collection_id: int = None
+
+
+class BulkUpdatePlanner:
+    # タグ変更とコレクション移動をためておき、同じ状態になるものをまとめて
+    # 最小限の PUT /raindrops/{collection} に変換する
+    def __init__(self, raindropio: RaindropIO):
+        self.raindropio = raindropio
+        # raindropのidごとに最終的な状態をまとめる
+        self._pending: dict[int, _PendingUpdate] = {}
+        # まとめずに bulk_update を呼んだ場合のリクエスト数
+        self._naive_requests = 0
+
+    def _entry(self, src_collection_id: int, raindrop: Raindrop) -> _PendingUpdate:
+        if raindrop._id is None:
+            raise Exception("Raindrop._id is required.")
+        # 移動を登録した後に移動先のコレクションで操作しても、同じエントリに
+        # まとめ、最初のコレクションに対する1回のリクエストで送る
+        entry = self._pending.get(raindrop._id)
+        if entry is None:
+            entry = _PendingUpdate(src_collection_id, raindrop)
+            self._pending[raindrop._id] = entry
+        return entry
+
+    def _count_naive(self, n: int, passes: int = 1) -> None:
+        chunks = math.ceil(n / self.raindropio.MAX_ITEMS_PER_REQUEST)
+        self._naive_requests += chunks * passes
+
+    def queue_tags(
+        self,
+        src_collection_id: int,
+        raindrops: Iterable[Raindrop],
+        tags: list[str],
+        overwrite=False,  # Add tags to existing tags if false, otherwise overwrite
+    ) -> None:
+        n = 0
+        for raindrop in raindrops:
+            entry = self._entry(src_collection_id, raindrop)
+            if overwrite:
+                entry.clear = True
+                entry.tags = []
+            for tag in tags:
+                if tag not in entry.tags:
+                    entry.tags.append(tag)
+            n += 1
+        self._count_naive(n, passes=2 if overwrite else 1)
+
+    def queue_move(
+        self,
+        src_collection_id: int,
+        raindrops: Iterable[Raindrop],
+        dst_collection_id: int,
+    ) -> None:
+        n = 0
+        for raindrop in raindrops:
+            entry = self._entry(src_collection_id, raindrop)
+            entry.dst_collection_id = dst_collection_id
+            n += 1
+        self._count_naive(n)
+
+    def _chunked_updates(self, groups: dict[tuple, list[Raindrop]]) -> list[tuple]:
+        updates = []
+        for (src_collection_id, tags, dst_collection_id), raindrops in groups.items():
+            for chunk in self.raindropio._split_list(
+                raindrops, max_items=self.raindropio.MAX_ITEMS_PER_REQUEST
+            ):
+                updates.append(
+                    (
+                        src_collection_id,
+                        chunk,
+                        list(tags) if tags is not None else None,
+                        dst_collection_id,
+                    )
+                )
+        return updates
+
+    def _plan(self) -> list[list[tuple]]:
+        # 戻り値: フェーズごとの (src_collection_id, raindrops, tags, dst) のリスト
+        # 1. overwriteのためのタグ削除（tags=[]）
+        # 2. タグ追加と移動
+        clear_groups: dict[tuple, list[Raindrop]] = {}
+        update_groups: dict[tuple, list[Raindrop]] = {}
+        for entry in self._pending.values():
+            src_collection_id = entry.src_collection_id
+            # 順序が違うだけのタグは同じ状態としてまとめる
+            tags = tuple(sorted(entry.tags)) if entry.tags else None
+            if entry.clear:
+                # 追加するタグがなければ、削除と移動を1回で済ませる
+                dst = entry.dst_collection_id if tags is None else None
+                clear_groups.setdefault((src_collection_id, (), dst), []).append(
+                    entry.raindrop
+                )
+                if tags is None:
+                    continue
+            if tags is None and entry.dst_collection_id is None:
+                continue
+            key = (src_collection_id, tags, entry.dst_collection_id)
+            update_groups.setdefault(key, []).append(entry.raindrop)
+
+        phases = [
+            self._chunked_updates(clear_groups),
+            self._chunked_updates(update_groups),
+        ]
+        return [phase for phase in phases if phase]
+
+    def plan(self) -> list[list[tuple[int, dict]]]:
+        # 戻り値: フェーズごとの (src_collection_id, body) のリスト
+        return [
+            [
+                (
+                    src_collection_id,
+                    self.raindropio._make_request_body_bulk_update(
+                        raindrops, tags, dst_collection_id
+                    ),
+                )
+                for src_collection_id, raindrops, tags, dst_collection_id in phase
+            ]
+            for phase in self._plan()
+        ]
+
+    def report(self, phases: list[list[tuple]] = None) -> dict:
+        if phases is None:
+            phases = self._plan()
+        return {
+            "queued_items": len(self._pending),
+            "naive_requests": self._naive_requests,
+            "planned_requests": sum(len(phase) for phase in phases),
+        }
+
+    def execute(self, dry_run=False, max_workers: int = 1, rate_limiter=None) -> dict:
+        # dry_run=Trueの場合はリクエストを送らず、件数だけを返す
+        # max_workers: 同じフェーズ内のリクエストを並行して送る数
+        # rate_limiter: sync_scheduler.RateLimiter（各リクエストの前にacquireする）
+        phases = self._plan()
+        report = self.report(phases)
+        if dry_run:
+            return report
+
+        # _bulk_updateを通すことで、RaindropIOのindexにも反映される
+        def send(update: tuple) -> None:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            self.raindropio._bulk_update(*update)
+
+        for i, phase in enumerate(phases):
+            if i > 0:
+                time.sleep(5)
+            if max_workers > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    # 例外があれば再送出させるため、結果を取り出す
+                    list(executor.map(send, phase))
+            else:
+                for update in phase:
+                    send(update)
+
+        self._pending = {}
+        self._naive_requests = 0
+        return report
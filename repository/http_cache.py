@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlencode
+
+
+class CacheEntry:
+    def __init__(self, text: str, etag: str = None, last_modified: str = None):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self) -> dict:
+        # 条件付きリクエスト用のヘッダー
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CachedResponse:
+    # 304のときに_make_requestの呼び出し側へ返す、requests.Responseの代わり
+    def __init__(self, entry: CacheEntry):
+        self.status_code = 200
+        self.text = entry.text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def make_cache_key(token: str, url: str, query: dict = None) -> str:
+    # トークンごとに内容が異なるため、キーに含めてハッシュ化する
+    key = url
+    if query:
+        key += "?" + urlencode(sorted(query.items()))
+    return hashlib.sha256(f"{token}\n{key}".encode()).hexdigest()
+
+
+class MemoryHttpCache:
+    def __init__(self):
+        self._entries: dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry:
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+
+
+class DiskHttpCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> CacheEntry:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return CacheEntry(
+            text=data["text"],
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
+        )
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        data = {
+            "text": entry.text,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        # 書き込み途中のファイルを読まないよう、一時ファイルから置き換える
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
@@ -1,17 +1,40 @@
 import random
+import sys
 import time
-
-import requests
+from itertools import islice
+from typing import Iterable, Iterator
 
 from domain.raindrop import Raindrop
 from domain.raindrop_id import RaindropId
+from domain.raindrop_index import RaindropIndex
 from domain.raindropio_url import RaindropIOUrl
 from domain.response_to_raindrop import response_to_raindrop
+from repository.http_cache import CachedResponse, CacheEntry, make_cache_key
+
+
+def _requests():
+    # requestsの読み込みは重いため、最初のリクエストまで遅延させる
+    global requests
+    if "requests" not in globals():
+        import requests
+    return requests
+
+
+def __getattr__(name):
+    # repository.raindropio.requests を参照したとき（mock.patchなど）も読み込む
+    if name == "requests":
+        return _requests()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class RaindropIO:
-    def __init__(self, token: str):
+    def __init__(self, token: str, index: RaindropIndex = None, cache=None):
         self.token = token
+        # indexを渡すと、create/update_tags/delete/bulk_updateの結果を反映する
+        self.index = index
+        # cache: MemoryHttpCache / DiskHttpCache
+        # 渡すとGETをETag/Last-Modifiedによる条件付きリクエストにする
+        self.cache = cache
         self.url = RaindropIOUrl()
         self.headers = {
             "Content-Type": "application/json",
@@ -20,6 +43,11 @@ class RaindropIO:
         self.MAX_ITEMS_PER_REQUEST = 100
 
     def _make_request(self, method: str, url: str, body=None, query=None):
+        if method == "GET" and self.cache is not None:
+            return self._make_cached_get_request(url, query)
+
+        requests = _requests()
+
         if method == "GET":
             if query:
                 r = requests.get(url, headers=self.headers, params=query)
@@ -30,14 +58,48 @@ class RaindropIO:
         elif method == "PUT":
             r = requests.put(url, headers=self.headers, json=body)
         elif method == "DELETE":
-            r = requests.delete(url, headers=self.headers)
+            if body:
+                r = requests.delete(url, headers=self.headers, json=body)
+            else:
+                r = requests.delete(url, headers=self.headers)
         else:
             raise Exception("Invalid method")
 
         if r.status_code != requests.codes.ok:
-            print(r.text)
+            print(r.text, file=sys.stderr)
+            raise Exception(f"API request failed with status code: {r.status_code}")
+
+        return r
+
+    def _make_cached_get_request(self, url: str, query=None):
+        requests = _requests()
+        key = make_cache_key(self.token, url, query)
+        cached = self.cache.get(key)
+        headers = self.headers
+        if cached:
+            headers = {**self.headers, **cached.validators()}
+
+        if query:
+            r = requests.get(url, headers=headers, params=query)
+        else:
+            r = requests.get(url, headers=headers)
+
+        if cached and r.status_code == requests.codes.not_modified:
+            return CachedResponse(cached)
+
+        if r.status_code != requests.codes.ok:
+            print(r.text, file=sys.stderr)
             raise Exception(f"API request failed with status code: {r.status_code}")
 
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        # 200が返ったら常に古いエントリを置き換える。検証子がなければ削除する
+        if etag or last_modified:
+            self.cache.set(
+                key, CacheEntry(r.text, etag=etag, last_modified=last_modified)
+            )
+        elif cached:
+            self.cache.delete(key)
         return r
 
     def _get_total_pages(self, collection_id: int):
@@ -51,8 +113,15 @@ class RaindropIO:
         return page
 
     @staticmethod
-    def _split_list(items: list, max_items=100):
-        return [items[i : i + max_items] for i in range(0, len(items), max_items)]
+    def _split_list(items: Iterable, max_items=100) -> Iterator[list]:
+        # 入力を一度に展開せず、max_items件ずつ取り出す
+        # 呼び出し側が次のチャンクを要求するまで入力は読み進めない
+        iterator = iter(items)
+        while True:
+            chunk = list(islice(iterator, max_items))
+            if not chunk:
+                return
+            yield chunk
 
     def get(self, _id: RaindropId) -> Raindrop:
         r = self._make_request(
@@ -85,7 +154,10 @@ class RaindropIO:
             url=self.url.get_single(),
             body=body,
         )
-        return response_to_raindrop(r.json()["item"])
+        raindrop = response_to_raindrop(r.json()["item"])
+        if self.index is not None:
+            self.index.add(raindrop)
+        return raindrop
 
     def update_tags(self, _id: RaindropId, tags: list[str]) -> Raindrop:
         body = {
@@ -96,14 +168,20 @@ class RaindropIO:
             url=f"{self.url.get_single()}/{_id.value}",
             body=body,
         )
-        return response_to_raindrop(r.json()["item"])
+        raindrop = response_to_raindrop(r.json()["item"])
+        if self.index is not None:
+            self.index.add(raindrop)
+        return raindrop
 
     def delete(self, _id: RaindropId) -> bool:
         r = self._make_request(
             method="DELETE",
             url=f"{self.url.get_single()}/{_id.value}",
         )
-        return r.json()["result"]
+        result = r.json()["result"]
+        if result and self.index is not None:
+            self.index.remove(_id.value)
+        return result
 
     def bulk_get(self, collection_id: int, page: int = 0) -> list[Raindrop]:
         # collection_id: raindropio collection id
@@ -136,19 +214,19 @@ class RaindropIO:
         random_page = random.randint(0, total_pages - 1)
         return self.bulk_get(collection_id=collection_id, page=random_page)
 
-    def bulk_create(self, raindrops: list[Raindrop]) -> list[Raindrop]:
+    def bulk_create(self, raindrops: Iterable[Raindrop]) -> list[Raindrop]:
+        return list(self.bulk_create_iter(raindrops))
+
+    def bulk_create_iter(self, raindrops: Iterable[Raindrop]) -> Iterator[Raindrop]:
         # APIの制限に合わせて、リストを分割する（例：最大100項目ずつ）
         raindrop_chunks = self._split_list(
             raindrops, max_items=self.MAX_ITEMS_PER_REQUEST
         )
 
-        results = []
         for chunk in raindrop_chunks:
             result = self._bulk_create(chunk)
             time.sleep(1)
-            results.extend(result)
-
-        return results
+            yield from result
 
     def _bulk_create(self, raindrops: list[Raindrop]) -> list[Raindrop]:
         # リクエストボディの作成
@@ -160,16 +238,21 @@ class RaindropIO:
             url=self.url.get_bulk(),
             body=body,
         )
-        return [response_to_raindrop(item) for item in r.json()["items"]]
+        result = [response_to_raindrop(item) for item in r.json()["items"]]
+        if self.index is not None:
+            self.index.add_all(result)
+        return result
 
     def bulk_update_tags(
         self,
         src_collection_id: int,
         tags: list[str],
-        raindrops: list[Raindrop],
+        raindrops: Iterable[Raindrop],
         overwrite=False,  # Add tags to existing tags if false, otherwise overwrite
     ) -> None:
         if overwrite:
+            # 2回走査するため、ジェネレータはここで展開する
+            raindrops = list(raindrops)
             self.bulk_update(
                 src_collection_id,
                 raindrops,
@@ -187,7 +270,7 @@ class RaindropIO:
     def bulk_update(
         self,
         src_collection_id: int,
-        raindrops: list[Raindrop],
+        raindrops: Iterable[Raindrop],
         tags=None,
         dst_collection_id=None,
     ) -> None:
@@ -200,6 +283,33 @@ class RaindropIO:
 
         return None
 
+    def bulk_delete(
+        self,
+        src_collection_id: int,
+        raindrops: Iterable[Raindrop],
+    ) -> int:
+        # 削除した件数を返す
+        raindrop_chunks = self._split_list(
+            raindrops, max_items=self.MAX_ITEMS_PER_REQUEST
+        )
+
+        modified = 0
+        for chunk in raindrop_chunks:
+            modified += self._bulk_delete(src_collection_id, chunk)
+        return modified
+
+    def _bulk_delete(self, src_collection_id: int, raindrops: list[Raindrop]) -> int:
+        body = {"ids": [raindrop._id for raindrop in raindrops]}
+        r = self._make_request(
+            method="DELETE",
+            url=f"{self.url.get_bulk()}/{src_collection_id}",
+            body=body,
+        )
+        if self.index is not None:
+            for _id in body["ids"]:
+                self.index.remove(_id)
+        return r.json().get("modified", len(raindrops))
+
     @staticmethod
     def _make_request_body_bulk_update(
         raindrops: list[Raindrop],
@@ -232,8 +342,44 @@ class RaindropIO:
         _ = self._make_request(
             method="PUT", url=f"{self.url.get_bulk()}/{src_collection_id}", body=body
         )
+        self._update_index_bulk(raindrops, tags, dst_collection_id)
         return None
 
+    def _update_index_bulk(
+        self,
+        raindrops: list[Raindrop],
+        tags: list[str] = None,
+        dst_collection_id: int = None,
+    ) -> None:
+        # bulk updateはitemを返さないため、送った変更をindex上のRaindropに適用する
+        # tags=[]は全削除、それ以外は既存のタグに追加
+        if self.index is None:
+            return
+        # 複数スレッドから呼ばれても読み込みと更新の間に割り込まれないようにする
+        with self.index.lock:
+            for raindrop in raindrops:
+                indexed = self.index.get(raindrop._id)
+                if indexed is None:
+                    continue
+                new_tags = indexed.tags
+                if tags is not None:
+                    current = indexed.tags or []
+                    new_tags = (
+                        []
+                        if not tags
+                        else current + [t for t in tags if t not in current]
+                    )
+                # indexのポスティングを正しく外せるよう、元のオブジェクトは変更しない
+                self.index.add(
+                    Raindrop(
+                        link=indexed.link,
+                        _id=RaindropId(indexed._id),
+                        collection_id=dst_collection_id or indexed.collection_id,
+                        title=indexed.title,
+                        tags=new_tags,
+                    )
+                )
+
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,187 @@
+# Binary snapshot of a collection, read through mmap
+#
+# Layout (little endian):
+#   header   : magic(4s) version(H) reserved(H) count(Q) records_offset(Q)
+#   strings  : UTF-8 links, titles and tags (tags joined by TAG_SEPARATOR)
+#   records  : count * (_id(q) collection_id(q)
+#                       link_offset(Q) link_length(I)
+#                       title_offset(Q) title_length(I)
+#                       tags_offset(Q) tags_length(I))
+# Offsets are absolute file positions. None is stored as NONE_INT / NONE_LENGTH.
+import mmap
+import os
+import struct
+import threading
+from typing import Iterable, Iterator
+
+from domain.raindrop import Raindrop
+from domain.raindrop_id import RaindropId
+
+MAGIC = b"RDSN"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+RECORD = struct.Struct("<qqQIQIQI")
+NONE_INT = -(2**63)
+NONE_LENGTH = 0xFFFFFFFF
+TAG_SEPARATOR = "\x1f"
+
+
+def write_snapshot(path: str, raindrops: Iterable[Raindrop]) -> int:
+    # bulk_get_allの結果やSyncSchedulerのページをそのまま渡せる
+    # 既存のファイルを他のプロセスがmmapしている場合があるため、切り詰めずに
+    # 同じディレクトリの一時ファイルへ書いてから置き換える
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        count = _write_snapshot_file(tmp_path, raindrops)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def _write_snapshot_file(path: str, raindrops: Iterable[Raindrop]) -> int:
+    # 文字列はそのままファイルへ書き出し、固定長のレコードだけをメモリに持つ
+    records = bytearray()
+    tags_offsets: dict[bytes, int] = {}
+    count = 0
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+        def write_string(value: str) -> tuple[int, int]:
+            if value is None:
+                return 0, NONE_LENGTH
+            data = value.encode("utf-8")
+            offset = f.tell()
+            f.write(data)
+            return offset, len(data)
+
+        for raindrop in raindrops:
+            link = write_string(raindrop.link)
+            title = write_string(raindrop.title)
+
+            if raindrop.tags is None:
+                tags = (0, NONE_LENGTH)
+            else:
+                if any(TAG_SEPARATOR in tag for tag in raindrop.tags):
+                    raise Exception("Raindrop.tags must not contain \\x1f.")
+                # 空のタグは[]と区別できなくなるため書き出せない
+                if any(tag == "" for tag in raindrop.tags):
+                    raise Exception("Raindrop.tags must not contain empty tags.")
+                data = TAG_SEPARATOR.join(raindrop.tags).encode("utf-8")
+                # 同じタグの組み合わせは一度だけ書き出す
+                offset = tags_offsets.get(data)
+                if offset is None:
+                    offset = f.tell()
+                    f.write(data)
+                    tags_offsets[data] = offset
+                tags = (offset, len(data))
+
+            records += RECORD.pack(
+                NONE_INT if raindrop._id is None else raindrop._id,
+                NONE_INT if raindrop.collection_id is None else raindrop.collection_id,
+                *link,
+                *title,
+                *tags,
+            )
+            count += 1
+
+        records_offset = f.tell()
+        f.write(records)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, records_offset))
+
+    return count
+
+
+class RaindropSnapshot:
+    # 読み取り専用のmmapなので、fork後のワーカープロセス間でページを共有できる
+    def __init__(self, path: str):
+        self.path = path
+        self._mmap = None
+        self._view = None
+        with open(path, "rb") as f:
+            # 空のファイルはmmapできないため、先にサイズを確認する
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise Exception(f"Invalid snapshot file: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        magic, version, _, count, records_offset = HEADER.unpack_from(self._view, 0)
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or records_offset < HEADER.size
+            or records_offset + count * RECORD.size > len(self._mmap)
+        ):
+            self.close()
+            raise Exception(f"Invalid snapshot file: {path}")
+        self._count = count
+        self._records_offset = records_offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, i: int) -> tuple:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("snapshot index out of range")
+        return RECORD.unpack_from(self._view, self._records_offset + i * RECORD.size)
+
+    def _string(self, offset: int, length: int) -> str:
+        if length == NONE_LENGTH:
+            return None
+        return str(self._view[offset : offset + length], "utf-8")
+
+    def get_id(self, i: int) -> int:
+        _id = self._record(i)[0]
+        return None if _id == NONE_INT else _id
+
+    def __getitem__(self, i: int) -> Raindrop:
+        (
+            _id,
+            collection_id,
+            link_offset,
+            link_length,
+            title_offset,
+            title_length,
+            tags_offset,
+            tags_length,
+        ) = self._record(i)
+
+        tags = self._string(tags_offset, tags_length)
+        if tags is not None:
+            tags = tags.split(TAG_SEPARATOR) if tags else []
+
+        return Raindrop(
+            link=self._string(link_offset, link_length),
+            _id=None if _id == NONE_INT else RaindropId(_id),
+            collection_id=None if collection_id == NONE_INT else collection_id,
+            title=self._string(title_offset, title_length),
+            tags=tags,
+        )
+
+    def __iter__(self) -> Iterator[Raindrop]:
+        for i in range(self._count):
+            yield self[i]
+
+    def ids(self) -> Iterator[int]:
+        # Raindropオブジェクトを作らずにidだけを読む
+        for i in range(self._count):
+            yield self.get_id(i)
@@ -0,0 +1,116 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator
+
+from domain.raindrop import Raindrop
+from repository.raindropio import RaindropIO
+
+
+class RateLimiter:
+    # 複数スレッドで共有するリクエスト間隔の制御
+    # raindrop.ioのAPIは1分あたり120リクエストまで
+    def __init__(self, requests_per_second: float = 2.0):
+        if requests_per_second <= 0:
+            raise Exception("requests_per_second must be positive.")
+        self.interval = 1.0 / requests_per_second
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SyncScheduler:
+    def __init__(
+        self,
+        raindropio: RaindropIO,
+        max_workers: int = 4,
+        rate_limiter: RateLimiter = None,
+    ):
+        self.raindropio = raindropio
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter if rate_limiter else RateLimiter()
+
+    @staticmethod
+    def _order(
+        collection_ids: Iterable[int],
+        sizes: dict[int, int] = None,
+        last_synced: dict[int, float] = None,
+    ) -> list[int]:
+        # sizes: 件数の少ないコレクションから取得する
+        # last_synced: 最後に同期した時刻が古いものから取得する（未同期が最優先）
+        ids = list(dict.fromkeys(collection_ids))
+        if sizes is not None:
+            return sorted(ids, key=lambda _id: sizes.get(_id, 0))
+        if last_synced is not None:
+            return sorted(ids, key=lambda _id: last_synced.get(_id, float("-inf")))
+        return ids
+
+    def _fetch_collection(
+        self, collection_id: int, stop: threading.Event = None
+    ) -> list[Raindrop]:
+        # _get_total_pagesを使わず、空のページが返るまで一度だけ読む
+        # stopがセットされたら、次のページを取得せずに打ち切る
+        result = []
+        page = 0
+        while True:
+            if stop is not None and stop.is_set():
+                break
+            self.rate_limiter.acquire()
+            items = self.raindropio.bulk_get(collection_id=collection_id, page=page)
+            if not items:
+                break
+            result.extend(items)
+            page += 1
+        return result
+
+    def sync(
+        self,
+        collection_ids: Iterable[int],
+        sizes: dict[int, int] = None,
+        last_synced: dict[int, float] = None,
+    ) -> Iterator[tuple[int, list[Raindrop]]]:
+        # 取得が完了したコレクションから順に (collection_id, raindrops) を返す
+        ordered = self._order(collection_ids, sizes=sizes, last_synced=last_synced)
+
+        # 同時に投入するのはmax_workers件まで。ジェネレータが閉じられるか
+        # 例外が起きた場合は、未着手の取得を取り消し、実行中の取得も止める
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        remaining = iter(ordered)
+        running = {}
+
+        def submit_next() -> None:
+            for collection_id in remaining:
+                future = executor.submit(self._fetch_collection, collection_id, stop)
+                running[future] = collection_id
+                return
+
+        try:
+            for _ in range(self.max_workers):
+                submit_next()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collection_id = running.pop(future)
+                    result = future.result()
+                    submit_next()
+                    yield collection_id, result
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def sync_all(
+        self,
+        collection_ids: Iterable[int],
+        sizes: dict[int, int] = None,
+        last_synced: dict[int, float] = None,
+    ) -> dict[int, list[Raindrop]]:
+        return dict(self.sync(collection_ids, sizes=sizes, last_synced=last_synced))
@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from domain.raindrop import Raindrop
+from domain.raindrop_id import RaindropId
+from domain.raindrop_index import RaindropIndex
+from repository.bulk_update_planner import BulkUpdatePlanner
+from repository.raindropio import RaindropIO
+
+
+@pytest.fixture
+def planner():
+    return BulkUpdatePlanner(RaindropIO("test_token"))
+
+
+def make_raindrops(ids):
+    return [Raindrop(link=f"https://example{i}.com", _id=RaindropId(i)) for i in ids]
+
+
+def test_plan_merges_tags_and_move(planner):
+    raindrops = make_raindrops(range(1, 4))
+    planner.queue_tags(1, raindrops, ["a"])
+    planner.queue_tags(1, raindrops[:2], ["b"])
+    planner.queue_move(1, raindrops, 2)
+
+    phases = planner.plan()
+
+    assert phases == [
+        [
+            (1, {"ids": [1, 2], "tags": ["a", "b"], "collection": {"$id": 2}}),
+            (1, {"ids": [3], "tags": ["a"], "collection": {"$id": 2}}),
+        ]
+    ]
+
+
+def test_plan_overwrite_clears_first(planner):
+    raindrops = make_raindrops(range(1, 3))
+    planner.queue_tags(1, raindrops, ["old"])
+    planner.queue_tags(1, raindrops[:1], ["new"], overwrite=True)
+    planner.queue_tags(1, make_raindrops([3]), [], overwrite=True)
+    planner.queue_move(1, make_raindrops([3]), 5)
+
+    phases = planner.plan()
+
+    assert phases == [
+        [
+            (1, {"ids": [1], "tags": []}),
+            (1, {"ids": [3], "tags": [], "collection": {"$id": 5}}),
+        ],
+        [
+            (1, {"ids": [1], "tags": ["new"]}),
+            (1, {"ids": [2], "tags": ["old"]}),
+        ],
+    ]
+
+
+def test_dry_run_reports_counts(planner):
+    raindrops = make_raindrops(range(1, 151))
+    planner.queue_tags(1, raindrops, ["a"])
+    planner.queue_move(1, raindrops, 2)
+
+    with patch("repository.raindropio.requests.put") as mock_put:
+        report = planner.execute(dry_run=True)
+        mock_put.assert_not_called()
+
+    assert report == {"queued_items": 150, "naive_requests": 4, "planned_requests": 2}
+
+
+def test_execute_mock(planner):
+    planner.queue_tags(1, make_raindrops(range(1, 4)), ["a"])
+
+    with patch("repository.raindropio.requests.put") as mock_put:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_put.return_value = mock_response
+
+        report = planner.execute()
+
+        mock_put.assert_called_once()
+        called_url, called_kwargs = mock_put.call_args
+        assert called_url[0] == f"{planner.raindropio.url.get_bulk()}/1"
+        assert called_kwargs["json"] == {"ids": [1, 2, 3], "tags": ["a"]}
+
+    assert report["planned_requests"] == 1
+    assert planner.plan() == []
+
+
+def test_plan_merges_same_tag_set_in_any_order(planner):
+    planner.queue_tags(1, make_raindrops([1]), ["b", "a"])
+    planner.queue_tags(1, make_raindrops([2]), ["a", "b"])
+
+    assert planner.plan() == [[(1, {"ids": [1, 2], "tags": ["a", "b"]})]]
+
+
+def test_plan_follows_moved_raindrop(planner):
+    raindrops = make_raindrops([1])
+    planner.queue_move(1, raindrops, 2)
+    planner.queue_tags(2, raindrops, ["a"])
+
+    assert planner.plan() == [
+        [(1, {"ids": [1], "tags": ["a"], "collection": {"$id": 2}})]
+    ]
+
+
+def test_execute_updates_index():
+    raindrops = make_raindrops([1, 2])
+    index = RaindropIndex(raindrops)
+    planner = BulkUpdatePlanner(RaindropIO("test_token", index=index))
+    planner.queue_tags(1, raindrops, ["a"])
+    planner.queue_move(1, raindrops[:1], 3)
+
+    with patch("repository.raindropio.requests.put") as mock_put:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_put.return_value = mock_response
+
+        planner.execute()
+
+        assert mock_put.call_count == 2
+
+    assert index.find_by_tag("a") == {1, 2}
+    assert index.get(1).collection_id == 3
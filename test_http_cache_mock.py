@@ -0,0 +1,100 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from repository.http_cache import DiskHttpCache, MemoryHttpCache
+from repository.raindropio import RaindropIO
+
+ITEM = {
+    "_id": 1,
+    "title": "Test Item",
+    "link": "https://example.com",
+    "tags": ["test"],
+    "collection": {"$id": 1},
+}
+
+
+def make_response(status_code, body=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    if body is not None:
+        response.text = json.dumps(body)
+        response.json.return_value = body
+    return response
+
+
+@pytest.fixture(params=["memory", "disk"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryHttpCache()
+    return DiskHttpCache(str(tmp_path))
+
+
+def test_bulk_get_uses_cached_body_on_304(cache):
+    raindropio = RaindropIO("test_token", cache=cache)
+
+    with patch("repository.raindropio.requests.get") as mock_get:
+        mock_get.side_effect = [
+            make_response(200, {"items": [ITEM]}, {"ETag": '"v1"'}),
+            make_response(304),
+        ]
+
+        first = raindropio.bulk_get(collection_id=1, page=0)
+        second = raindropio.bulk_get(collection_id=1, page=0)
+
+        assert [r._id for r in first] == [r._id for r in second] == [1]
+        assert second[0].tags == ["test"]
+        assert "If-None-Match" not in mock_get.call_args_list[0].kwargs["headers"]
+        assert mock_get.call_args_list[1].kwargs["headers"]["If-None-Match"] == '"v1"'
+        assert mock_get.call_args_list[1].kwargs["params"] == {"perpage": 50, "page": 0}
+
+
+def test_cache_key_depends_on_query(cache):
+    raindropio = RaindropIO("test_token", cache=cache)
+
+    with patch("repository.raindropio.requests.get") as mock_get:
+        mock_get.side_effect = [
+            make_response(200, {"items": [ITEM]}, {"Last-Modified": "yesterday"}),
+            make_response(200, {"items": []}),
+        ]
+
+        raindropio.bulk_get(collection_id=1, page=0)
+        raindropio.bulk_get(collection_id=1, page=1)
+
+        assert "If-Modified-Since" not in mock_get.call_args_list[1].kwargs["headers"]
+
+
+def test_cached_get_error(cache):
+    raindropio = RaindropIO("test_token", cache=cache)
+
+    with patch("repository.raindropio.requests.get") as mock_get:
+        mock_get.return_value = make_response(404)
+
+        with pytest.raises(Exception) as excinfo:
+            raindropio.bulk_get(collection_id=1)
+
+        assert "API request failed with status code: 404" in str(excinfo.value)
+
+
+def test_200_without_validators_drops_cached_entry(cache):
+    raindropio = RaindropIO("test_token", cache=cache)
+    newer = dict(ITEM, title="Newer")
+
+    with patch("repository.raindropio.requests.get") as mock_get:
+        mock_get.side_effect = [
+            make_response(200, {"items": [ITEM]}, {"ETag": '"v1"'}),
+            make_response(200, {"items": [newer]}),
+            make_response(304),
+        ]
+
+        raindropio.bulk_get(collection_id=1)
+        assert raindropio.bulk_get(collection_id=1)[0].title == "Newer"
+
+        # 古いエントリが残っていないので、条件付きリクエストにならない
+        with pytest.raises(Exception) as excinfo:
+            raindropio.bulk_get(collection_id=1)
+
+        assert "status code: 304" in str(excinfo.value)
+        assert "If-None-Match" not in mock_get.call_args_list[2].kwargs["headers"]
@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from domain.raindrop import Raindrop
+from domain.raindrop_id import RaindropId
+from domain.raindrop_index import RaindropIndex
+from repository.raindropio import RaindropIO
+
+
+@pytest.fixture
+def index():
+    return RaindropIndex(
+        [
+            Raindrop(
+                link="https://www.python.org/doc",
+                _id=RaindropId(1),
+                title="Python Documentation",
+                tags=["python", "docs"],
+            ),
+            Raindrop(
+                link="https://docs.rust-lang.org/book",
+                _id=RaindropId(2),
+                title="The Rust Book",
+                tags=["rust", "docs"],
+            ),
+            Raindrop(
+                link="https://example.com/pytest",
+                _id=RaindropId(3),
+                title="Pytest tips",
+                tags=["python", "testing"],
+            ),
+        ]
+    )
+
+
+def test_find_by_tags(index):
+    assert index.find_by_tag("docs") == {1, 2}
+    assert index.find_by_tags(all_of=["python", "docs"]) == {1}
+    assert index.find_by_tags(any_of=["rust", "testing"]) == {2, 3}
+    assert index.find_by_tags(all_of=["python"], none_of=["docs"]) == {3}
+    assert index.find_by_tags(none_of=["python"]) == {2}
+
+
+def test_find_by_domain(index):
+    assert index.find_by_domain("python.org") == {1}
+    assert index.find_by_domain("www.python.org") == {1}
+
+
+def test_search(index):
+    assert index.search("py") == {1, 3}
+    assert index.search("py", prefix=False) == set()
+    assert index.search("rust book") == {2}
+    assert index.search("pytest") == {3}
+
+
+def test_remove_and_readd(index):
+    index.remove(3)
+    assert index.find_by_tag("testing") == set()
+    assert index.search("pytest") == set()
+    assert "testing" not in index.tags()
+
+    index.add(
+        Raindrop(
+            link="https://www.python.org/doc",
+            _id=RaindropId(1),
+            title="Python Docs",
+            tags=["python"],
+        )
+    )
+    assert index.find_by_tag("docs") == {2}
+    assert index.search("documentation") == set()
+    assert len(index) == 2
+
+
+def test_raindropio_updates_index(index):
+    raindropio = RaindropIO("test_token", index=index)
+
+    with patch("repository.raindropio.requests.put") as mock_put:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "item": {
+                "_id": 2,
+                "tags": ["rust", "favorite"],
+                "link": "https://docs.rust-lang.org/book",
+                "collection": {"$id": 1},
+                "title": "The Rust Book",
+            }
+        }
+        mock_put.return_value = mock_response
+        raindropio.update_tags(RaindropId(2), ["rust", "favorite"])
+
+    assert index.find_by_tag("favorite") == {2}
+    assert index.find_by_tag("docs") == {1}
+
+    with patch("repository.raindropio.requests.delete") as mock_delete:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"result": True}
+        mock_delete.return_value = mock_response
+        raindropio.delete(RaindropId(2))
+
+    assert 2 not in index
+    assert index.find_by_tag("rust") == set()
+
+
+def test_raindropio_bulk_update_updates_index(index):
+    raindropio = RaindropIO("test_token", index=index)
+    raindrops = index.to_raindrops([1, 3])
+
+    with patch("repository.raindropio.requests.put") as mock_put:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"result": True}
+        mock_put.return_value = mock_response
+
+        raindropio.bulk_update_tags(1, ["new"], raindrops)
+        assert index.find_by_tag("new") == {1, 3}
+        assert index.find_by_tag("python") == {1, 3}
+
+        raindropio.bulk_update(1, raindrops[:1], dst_collection_id=5)
+        assert index.get(1).collection_id == 5
+
+        with patch("repository.raindropio.time.sleep"):
+            raindropio.bulk_update_tags(1, ["only"], raindrops[1:], overwrite=True)
+
+    assert index.find_by_tag("only") == {3}
+    assert index.find_by_tag("python") == {1}
+    assert index.find_by_tag("new") == {1}
+
+
+def test_concurrent_updates_keep_index_consistent():
+    index = RaindropIndex()
+
+    def churn(worker):
+        for i in range(200):
+            _id = worker * 1000 + i
+            index.add(
+                Raindrop(
+                    link=f"https://example.com/{worker}/{i}",
+                    _id=RaindropId(_id),
+                    title=f"token{i} shared",
+                    tags=[f"tag{i % 5}"],
+                )
+            )
+            if i % 2:
+                index.remove(_id)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(churn, range(8)))
+
+    assert len(index) == 800
+    assert index._sorted_tokens == sorted(index._tokens)
+    assert len(index.search("shared")) == 800
+    assert index.find_by_tags(any_of=[f"tag{i}" for i in range(5)]) == set(
+        index.raindrops
+    )
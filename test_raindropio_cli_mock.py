@@ -0,0 +1,175 @@
+import io
+import json
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+from raindropio_cli import _read_raindrops, main
+
+
+def run(argv, stdin=""):
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with patch("sys.stdin", io.StringIO(stdin)), patch("sys.stdout", stdout), patch(
+        "sys.stderr", stderr
+    ):
+        code = main(argv)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def test_import_cli_is_lazy():
+    modules = "raindropio_cli, repository.raindropio"
+    code = f"import sys, {modules}; print('requests' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_requires_token():
+    code, _, stderr = run(["--token", "", "delete", "1"])
+    assert code == 2
+    assert "API token is required" in stderr
+
+
+def test_retag_dry_run():
+    stdin = "1\n2\n" + json.dumps({"_id": 3, "link": "https://example.com"}) + "\n"
+
+    with patch("repository.raindropio.requests.put") as mock_put:
+        code, _, stderr = run(
+            ["--token", "t", "retag", "1", "--tags", "a,b", "--dry-run"], stdin
+        )
+        mock_put.assert_not_called()
+
+    assert code == 0
+    assert "would send 1 requests for 3 raindrops" in stderr
+
+
+def test_delete_with_profile():
+    with patch("repository.raindropio.requests.delete") as mock_delete:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"result": True, "modified": 2}
+        mock_delete.return_value = mock_response
+
+        code, _, stderr = run(["--token", "t", "--profile", "delete", "5"], "1\n2\n")
+
+        called_url, called_kwargs = mock_delete.call_args
+        assert called_url[0].endswith("/raindrops/5")
+        assert called_kwargs["json"] == {"ids": [1, 2]}
+
+    assert code == 0
+    assert "deleted 2 raindrops" in stderr
+    assert "DELETE      1 requests" in stderr
+
+
+def test_export_jsonl():
+    pages = [
+        [
+            {
+                "_id": 1,
+                "title": "Item",
+                "link": "https://example.com",
+                "tags": ["x"],
+                "collection": {"$id": 7},
+            }
+        ],
+        [],
+    ]
+
+    with patch("repository.raindropio.requests.get") as mock_get:
+        responses = []
+        for items in pages:
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {"items": items}
+            responses.append(mock_response)
+        mock_get.side_effect = responses
+
+        code, stdout, _ = run(["--token", "t", "export", "7", "--rate", "1000"])
+
+    assert code == 0
+    assert [json.loads(line) for line in stdout.splitlines()] == [
+        {
+            "_id": 1,
+            "collection_id": 7,
+            "link": "https://example.com",
+            "title": "Item",
+            "tags": ["x"],
+        }
+    ]
+
+
+def test_export_api_error():
+    with patch("repository.raindropio.requests.get") as mock_get:
+        mock_response = MagicMock()
+        mock_response.status_code = 401
+        mock_response.text = '{"error":"unauthorized"}'
+        mock_get.return_value = mock_response
+
+        code, stdout, stderr = run(["--token", "t", "export", "7", "--rate", "1000"])
+
+    assert code == 1
+    assert stdout == ""
+    assert '{"error":"unauthorized"}' in stderr
+    assert "error: API request failed with status code: 401" in stderr
+
+
+def test_delete_concurrent_chunks():
+    with patch("repository.raindropio.requests.delete") as mock_delete:
+
+        def delete(url, headers, json):
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {"modified": len(json["ids"])}
+            return mock_response
+
+        mock_delete.side_effect = delete
+
+        stdin = "".join(f"{i}\n" for i in range(1, 251))
+        code, _, stderr = run(
+            ["--token", "t", "delete", "5", "--workers", "3", "--rate", "1000"], stdin
+        )
+
+        assert mock_delete.call_count == 3
+
+    assert code == 0
+    assert "deleted 250 raindrops" in stderr
+
+
+def test_import_concurrent_keeps_order():
+    def post(url, headers, json):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "items": [
+                {
+                    "_id": int(item["link"].rsplit("/", 1)[1]),
+                    "link": item["link"],
+                    "title": "",
+                    "tags": [],
+                    "collection": {"$id": 1},
+                }
+                for item in json["items"]
+            ]
+        }
+        return mock_response
+
+    stdin = "".join(
+        json.dumps({"link": f"https://example.com/{i}"}) + "\n" for i in range(150)
+    )
+    with patch("repository.raindropio.requests.post", side_effect=post):
+        code, stdout, _ = run(
+            ["--token", "t", "import", "--workers", "2", "--rate", "1000"], stdin
+        )
+
+    assert code == 0
+    assert [json.loads(line)["_id"] for line in stdout.splitlines()] == list(range(150))
+
+
+def test_read_raindrops_collection_id_zero():
+    f = io.StringIO(json.dumps({"link": "https://example.com", "collection_id": 5}))
+
+    raindrops = list(_read_raindrops(f, collection_id=0))
+
+    assert raindrops[0].collection_id == 0
@@ -330,3 +330,66 @@ def test_bulk_update_large_list_mock(raindropio):
 
         assert result is None
         assert mock_put.call_count == 3  # Should be called 3 times due to chunking
+
+
+def test_split_list_is_lazy(raindropio):
+    consumed = []
+
+    def gen():
+        for i in range(250):
+            consumed.append(i)
+            yield i
+
+    chunks = raindropio._split_list(gen(), max_items=100)
+    first = next(chunks)
+
+    assert first == list(range(100))
+    assert len(consumed) == 100
+    assert [len(chunk) for chunk in chunks] == [100, 50]
+
+
+def test_bulk_update_generator_mock(raindropio):
+    raindrops = (
+        Raindrop(link=f"https://example{i}.com", _id=RaindropId(i))
+        for i in range(1, 202)
+    )
+
+    with patch.object(raindropio, "_bulk_update") as mock_bulk_update:
+        raindropio.bulk_update(1, raindrops, tags=["updated"])
+
+        assert mock_bulk_update.call_count == 3
+        sizes = [len(call.args[1]) for call in mock_bulk_update.call_args_list]
+        assert sizes == [100, 100, 1]
+
+
+def test_bulk_create_generator_mock(raindropio):
+    raindrops = (Raindrop(link=f"https://example{i}.com") for i in range(201))
+
+    def bulk_create(chunk):
+        return [{"link": raindrop.link} for raindrop in chunk]
+
+    with patch.object(
+        raindropio, "_bulk_create", side_effect=bulk_create
+    ) as mock_bulk_create, patch("repository.raindropio.time.sleep"):
+        result = raindropio.bulk_create(raindrops)
+
+        sizes = [len(call.args[0]) for call in mock_bulk_create.call_args_list]
+        assert sizes == [100, 100, 1]
+
+    assert [item["link"] for item in result] == [
+        f"https://example{i}.com" for i in range(201)
+    ]
+
+
+def test_bulk_create_iter_is_lazy_mock(raindropio):
+    raindrops = (Raindrop(link=f"https://example{i}.com") for i in range(150))
+
+    with patch.object(
+        raindropio, "_bulk_create", side_effect=lambda chunk: chunk
+    ) as mock_bulk_create, patch("repository.raindropio.time.sleep"):
+        created = raindropio.bulk_create_iter(raindrops)
+        assert next(created).link == "https://example0.com"
+        assert mock_bulk_create.call_count == 1
+
+        assert len(list(created)) == 149
+        assert mock_bulk_create.call_count == 2
@@ -0,0 +1,133 @@
+import pytest
+
+from domain.raindrop import Raindrop
+from domain.raindrop_id import RaindropId
+from repository.snapshot import RaindropSnapshot, write_snapshot
+
+
+@pytest.fixture
+def raindrops():
+    return [
+        Raindrop(
+            link="https://example.com/1",
+            _id=RaindropId(1),
+            collection_id=10,
+            title="日本語のタイトル",
+            tags=["a", "b"],
+        ),
+        Raindrop(
+            link="https://example.com/2",
+            _id=RaindropId(2),
+            collection_id=10,
+            title="",
+            tags=["a", "b"],
+        ),
+        Raindrop(link="https://example.com/3", tags=[]),
+    ]
+
+
+def test_write_and_read_snapshot(tmp_path, raindrops):
+    path = str(tmp_path / "collection.snapshot")
+
+    count = write_snapshot(path, iter(raindrops))
+
+    assert count == 3
+    with RaindropSnapshot(path) as snapshot:
+        assert len(snapshot) == 3
+        assert list(snapshot.ids()) == [1, 2, None]
+
+        loaded = list(snapshot)
+        for expected, actual in zip(raindrops, loaded):
+            assert actual._id == expected._id
+            assert actual.collection_id == expected.collection_id
+            assert actual.link == expected.link
+            assert actual.title == expected.title
+            assert actual.tags == expected.tags
+
+        assert snapshot[-1].title is None
+        with pytest.raises(IndexError):
+            snapshot[3]
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "empty.snapshot")
+    write_snapshot(path, [])
+
+    with RaindropSnapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert list(snapshot) == []
+
+
+def test_invalid_snapshot(tmp_path):
+    path = tmp_path / "invalid.snapshot"
+    path.write_bytes(b"not a snapshot file at all")
+
+    with pytest.raises(Exception) as excinfo:
+        RaindropSnapshot(str(path))
+
+    assert "Invalid snapshot file" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("size", [0, 10])
+def test_short_snapshot(tmp_path, size):
+    path = tmp_path / "short.snapshot"
+    path.write_bytes(b"\0" * size)
+
+    with pytest.raises(Exception) as excinfo:
+        RaindropSnapshot(str(path))
+
+    assert "Invalid snapshot file" in str(excinfo.value)
+
+
+def test_truncated_snapshot(tmp_path, raindrops):
+    path = tmp_path / "truncated.snapshot"
+    write_snapshot(str(path), raindrops)
+    path.write_bytes(path.read_bytes()[:-1])
+
+    with pytest.raises(Exception) as excinfo:
+        RaindropSnapshot(str(path))
+
+    assert "Invalid snapshot file" in str(excinfo.value)
+
+
+def test_empty_tag_is_rejected(tmp_path):
+    path = str(tmp_path / "empty_tag.snapshot")
+
+    with pytest.raises(Exception) as excinfo:
+        write_snapshot(path, [Raindrop(link="https://example.com", tags=[""])])
+
+    assert "empty tags" in str(excinfo.value)
+
+
+def test_rewrite_while_reader_is_open(tmp_path):
+    path = str(tmp_path / "shared.snapshot")
+    write_snapshot(
+        path,
+        (
+            Raindrop(link=f"https://example.com/{i}", _id=RaindropId(i))
+            for i in range(2000)
+        ),
+    )
+
+    with RaindropSnapshot(path) as snapshot:
+        write_snapshot(path, [Raindrop(link="https://example.com/new")])
+
+        # 開いているreaderは置き換え前のファイルを読み続ける
+        assert snapshot[1500].link == "https://example.com/1500"
+        assert len(snapshot) == 2000
+
+    with RaindropSnapshot(path) as snapshot:
+        assert len(snapshot) == 1
+    assert list(tmp_path.iterdir()) == [tmp_path / "shared.snapshot"]
+
+
+def test_failed_write_keeps_previous_snapshot(tmp_path, raindrops):
+    path = str(tmp_path / "collection.snapshot")
+    write_snapshot(path, raindrops)
+
+    with pytest.raises(Exception):
+        write_snapshot(path, [Raindrop(link="https://example.com", tags=[""])])
+
+    with RaindropSnapshot(path) as snapshot:
+        assert len(snapshot) == 3
+    assert list(tmp_path.iterdir()) == [tmp_path / "collection.snapshot"]
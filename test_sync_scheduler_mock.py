@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+import pytest
+
+from repository.raindropio import RaindropIO
+from repository.sync_scheduler import RateLimiter, SyncScheduler
+
+
+@pytest.fixture
+def scheduler():
+    raindropio = RaindropIO("test_token")
+    return SyncScheduler(raindropio, max_workers=2, rate_limiter=RateLimiter(1000))
+
+
+def test_order_by_size():
+    ordered = SyncScheduler._order([1, 2, 3], sizes={1: 500, 2: 10, 3: 50})
+    assert ordered == [2, 3, 1]
+
+
+def test_order_by_last_synced():
+    ordered = SyncScheduler._order([1, 2, 3], last_synced={1: 200.0, 2: 100.0})
+    assert ordered == [3, 2, 1]
+
+
+def test_sync_mock(scheduler):
+    pages = {
+        1: [[{"id": 1}], [{"id": 2}], []],
+        2: [[{"id": 3}], []],
+    }
+
+    def bulk_get(collection_id, page=0):
+        return pages[collection_id][page]
+
+    with patch.object(scheduler.raindropio, "bulk_get", side_effect=bulk_get):
+        result = scheduler.sync_all([1, 2])
+
+    assert result == {1: [{"id": 1}, {"id": 2}], 2: [{"id": 3}]}
+
+
+def test_rate_limiter_spacing():
+    limiter = RateLimiter(requests_per_second=20)
+    with patch("repository.sync_scheduler.time.sleep") as mock_sleep:
+        for _ in range(3):
+            limiter.acquire()
+
+    waits = [call.args[0] for call in mock_sleep.call_args_list]
+    assert len(waits) == 2
+    assert waits[-1] == pytest.approx(0.1, abs=0.01)
+
+
+def test_sync_close_stops_fetching(scheduler):
+    scheduler.max_workers = 1
+
+    def bulk_get(collection_id, page=0):
+        return [{"id": collection_id}] if page == 0 else []
+
+    with patch.object(
+        scheduler.raindropio, "bulk_get", side_effect=bulk_get
+    ) as mock_bulk_get:
+        results = scheduler.sync([1, 2, 3, 4, 5])
+        assert next(results) == (1, [{"id": 1}])
+        results.close()
+
+        # 1件目と、閉じる前に投入された2件目の分だけ
+        assert mock_bulk_get.call_count <= 4
+
+
+def test_sync_error_propagates(scheduler):
+    with patch.object(
+        scheduler.raindropio, "bulk_get", side_effect=Exception("failed")
+    ):
+        with pytest.raises(Exception) as excinfo:
+            scheduler.sync_all([1, 2, 3])
+
+    assert "failed" in str(excinfo.value)
@@ -0,0 +1,130 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from domain.raindrop import Raindrop
+from domain.raindrop_id import RaindropId
+from domain.tagging_rules import CompiledRules, TagRule, TagRuleEngine
+
+RULES = [
+    TagRule(tags=["python"], domains=["python.org"], title_keywords=["python"]),
+    TagRule(tags=["video"], domains=["youtube.com"], url_patterns=[r"/watch\?v="]),
+    TagRule(tags=["cpp"], title_keywords=["C++"]),
+]
+
+
+@pytest.fixture
+def raindrops():
+    return [
+        Raindrop(
+            link="https://docs.python.org/3/",
+            _id=RaindropId(1),
+            title="Docs",
+        ),
+        Raindrop(
+            link="https://example.com/watch?v=abc",
+            _id=RaindropId(2),
+            title="Python talk",
+        ),
+        Raindrop(
+            link="https://example.com/cpp",
+            _id=RaindropId(3),
+            title="Modern C++ tips",
+        ),
+        Raindrop(
+            link="https://example.com/",
+            _id=RaindropId(4),
+            title="Pythonic? no match",
+        ),
+    ]
+
+
+def test_compiled_rules_match():
+    compiled = CompiledRules(RULES)
+    assert compiled.match("https://docs.python.org/3/", "Docs") == ("python",)
+    assert compiled.match("https://www.youtube.com/watch?v=1", "PYTHON") == (
+        "python",
+        "video",
+    )
+    assert compiled.match("https://example.com/", "c++ notes") == ("cpp",)
+    assert compiled.match("https://example.com/", "Pythonic") == ()
+
+    overlapping = CompiledRules(
+        [
+            TagRule(tags=["ml"], title_keywords=["machine learning"]),
+            TagRule(tags=["edu"], title_keywords=["learning"]),
+            TagRule(tags=["machine"], title_keywords=["Machine"]),
+        ]
+    )
+    assert overlapping.match(None, "Machine Learning basics") == (
+        "edu",
+        "machine",
+        "ml",
+    )
+    assert overlapping.match(None, "Machinelearning") == ()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_assign(raindrops, max_workers):
+    engine = TagRuleEngine(RULES, max_workers=max_workers, page_size=2)
+    groups = engine.assign(raindrops)
+
+    assert {tags: [r._id for r in rs] for tags, rs in groups.items()} == {
+        ("python",): [1],
+        ("python", "video"): [2],
+        ("cpp",): [3],
+    }
+
+
+def test_apply(raindrops):
+    raindropio = MagicMock()
+    groups = {("cpp",): [raindrops[2]]}
+
+    TagRuleEngine.apply(raindropio, 1, groups)
+
+    raindropio.bulk_update.assert_called_once_with(1, [raindrops[2]], tags=["cpp"])
+
+
+def test_url_patterns_with_flags_and_group_names():
+    compiled = CompiledRules(
+        [
+            TagRule(tags=["video"], url_patterns=[r"(?i)/watch", r"(?P<v>shorts)"]),
+            TagRule(tags=["clip"], url_patterns=[r"/video", r"(?P<v>clips)"]),
+        ]
+    )
+
+    assert compiled.match("https://example.com/WATCH?v=1", None) == ("video",)
+    assert compiled.match("https://example.com/shorts/1", None) == ("video",)
+    assert compiled.match("https://example.com/video/1", None) == ("clip",)
+    assert compiled.match("https://example.com/clips/shorts", None) == (
+        "clip",
+        "video",
+    )
+    assert compiled.match("https://example.com/Video", None) == ()
+
+
+def test_evaluate_limits_pages_in_flight(raindrops):
+    engine = TagRuleEngine(RULES, max_workers=2, page_size=1)
+    pulled = []
+
+    def source():
+        for raindrop in raindrops:
+            pulled.append(raindrop._id)
+            yield raindrop
+
+    evaluated = engine._evaluate(engine._pages(source()))
+    page, _ = next(evaluated)
+
+    assert [r._id for r in page] == [1]
+    assert pulled == [1, 2]
+    evaluated.close()
+
+
+def test_single_page_runs_in_process(raindrops):
+    engine = TagRuleEngine(RULES, page_size=10)
+
+    with patch("domain.tagging_rules.ProcessPoolExecutor") as mock_executor:
+        groups = engine.assign(raindrops)
+        mock_executor.assert_not_called()
+
+    assert set(groups) == {("python",), ("python", "video"), ("cpp",)}